@@ -1,7 +1,22 @@
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import datetime
+from urllib.parse import parse_qs
+import functools
+import hashlib
+import hmac
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
 import pandas as pd
 from shiny import App, ui, render, reactive
 import plotly.express as px
+import plotly.graph_objects as go
 from shinywidgets import output_widget, render_widget
 
 right_nav_css = """
@@ -24,11 +39,236 @@ file_path = Path(__file__).parent / "olympics_cleaned.csv"
 df = pd.read_csv(file_path)
 
 
+# Persistent on-disk cache for computed aggregates and rendered payloads.
+# Entries are keyed by the dataset content hash and the code version, so a new
+# worker reuses them after a restart and ignores them when either changes.
+# Values are stored as JSON, so they only need to be plain strings, numbers,
+# lists and dicts.
+cache_path = Path(os.environ.get("OLYMPIC_CACHE_PATH", Path(__file__).parent / ".aggregate_cache.sqlite"))
+cache_keep_versions = 3
+# Cache reads run inside render functions, so a locked database falls back to
+# computing quickly instead of stalling every session of the worker
+cache_timeout = 0.25
+dataset_hash = hashlib.sha256(file_path.read_bytes()).hexdigest()
+code_version = hashlib.sha256(Path(__file__).read_bytes()).hexdigest()
+memory_cache = {}
+
+
+def cache_connect():
+    conn = sqlite3.connect(cache_path, timeout=cache_timeout)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS aggregate_cache ("
+        "name TEXT, dataset_hash TEXT, code_version TEXT, value TEXT, created_at REAL, "
+        "PRIMARY KEY (name, dataset_hash, code_version))"
+    )
+    return conn
+
+
+# Keeping the rows of the most recently written versions, so workers of the
+# previous and the new version can share the cache during a rolling deploy
+def prune_aggregate_cache():
+    try:
+        with closing(cache_connect()) as conn, conn:
+            conn.execute(
+                "DELETE FROM aggregate_cache "
+                "WHERE NOT (dataset_hash = ? AND code_version = ?) "
+                "AND (dataset_hash, code_version) NOT IN ("
+                "SELECT dataset_hash, code_version FROM aggregate_cache "
+                "GROUP BY dataset_hash, code_version "
+                "ORDER BY MAX(created_at) DESC LIMIT ?)",
+                (dataset_hash, code_version, cache_keep_versions)
+            )
+    except sqlite3.Error:
+        pass
+
+
+def cached_aggregate(name, compute):
+    if name in memory_cache:
+        return memory_cache[name]
+
+    key = (name, dataset_hash, code_version)
+
+    # An unreadable or malformed entry is treated as a cache miss
+    try:
+        with closing(cache_connect()) as conn:
+            row = conn.execute(
+                "SELECT value FROM aggregate_cache WHERE name = ? AND dataset_hash = ? AND code_version = ?",
+                key
+            ).fetchone()
+        if row is not None:
+            memory_cache[name] = json.loads(row[0])
+            return memory_cache[name]
+    except (sqlite3.Error, ValueError):
+        pass
+
+    value = compute()
+    memory_cache[name] = value
+
+    # A cache that cannot be written must never stop the dashboard from rendering
+    try:
+        with closing(cache_connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO aggregate_cache VALUES (?, ?, ?, ?, ?)",
+                (*key, json.dumps(value), time.time())
+            )
+    except (sqlite3.Error, TypeError, ValueError):
+        pass
+
+    return value
+
+
+prune_aggregate_cache()
+
+
+# Converting a dataframe row to plain values that can be stored in the cache
+def row_to_dict(row):
+    return json.loads(row.to_json())
+
+
+# Opt-in profiling of reactive flushes. It is switched on for every session with
+# OLYMPIC_PROFILE=1, or for a single session by opening the app with
+# ?profile=<OLYMPIC_PROFILE_TOKEN>. Each profiled flush writes a speedscope
+# flamegraph file and a summary of the top functions per output.
+profile_dir = Path(os.environ.get("OLYMPIC_PROFILE_DIR", Path(__file__).parent / "profiles"))
+profile_always = os.environ.get("OLYMPIC_PROFILE") == "1"
+profile_token = os.environ.get("OLYMPIC_PROFILE_TOKEN")
+logger = logging.getLogger(__name__)
+
+try:
+    profile_keep = int(os.environ.get("OLYMPIC_PROFILE_KEEP", 200))
+except ValueError:
+    logger.warning("Ignoring invalid OLYMPIC_PROFILE_KEEP, keeping the newest 200 flush profiles")
+    profile_keep = 200
+
+
+class OutputProfiler:
+    # Records the call stack events of one output while it renders
+
+    def __init__(self):
+        self.keys = []
+        self.key_index = {}
+        self.events = []
+        self.stack = []
+        self.start = 0
+        self.end = 0
+
+    def hook(self, frame, event, arg):
+        now = time.perf_counter_ns() - self.start
+        if event == "call":
+            code = frame.f_code
+            key = (code.co_name, code.co_filename, code.co_firstlineno)
+        elif event == "c_call":
+            # Switching the profiler off at the end of run() is not part of the output
+            if arg is sys.setprofile:
+                return
+            key = (getattr(arg, "__qualname__", repr(arg)), getattr(arg, "__module__", None) or "<built-in>", 0)
+        else:
+            # Returns of frames entered before profiling started are ignored
+            if self.stack:
+                self.events.append(("C", self.stack.pop(), now))
+            return
+
+        if key not in self.key_index:
+            self.key_index[key] = len(self.keys)
+            self.keys.append(key)
+        self.stack.append(self.key_index[key])
+        self.events.append(("O", self.key_index[key], now))
+
+    def run(self, fn):
+        self.start = time.perf_counter_ns()
+        sys.setprofile(self.hook)
+        try:
+            return fn()
+        finally:
+            sys.setprofile(None)
+            self.end = time.perf_counter_ns() - self.start
+            while self.stack:
+                self.events.append(("C", self.stack.pop(), self.end))
+
+    def top_functions(self, limit=10):
+        self_time = {}
+        total_time = {}
+        open_frames = []
+        for kind, index, at in self.events:
+            if kind == "O":
+                open_frames.append([index, at, 0])
+                continue
+            index, started, child_time = open_frames.pop()
+            elapsed = at - started
+            self_time[index] = self_time.get(index, 0) + elapsed - child_time
+            # Recursive calls only count once towards the total time
+            if all(entry[0] != index for entry in open_frames):
+                total_time[index] = total_time.get(index, 0) + elapsed
+            if open_frames:
+                open_frames[-1][2] += elapsed
+
+        ranked = sorted(self_time, key=self_time.get, reverse=True)[:limit]
+        return [(self.keys[index], self_time[index], total_time.get(index, 0)) for index in ranked]
+
+
+def write_flush_profile(session_id, profilers):
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    stem = profile_dir / f"{datetime.now():%Y%m%d-%H%M%S-%f}-{session_id}"
+
+    frames = []
+    frame_index = {}
+    profiles = []
+    summary = [
+        "Times include the output function and the html serialization of plotly figures.",
+        "Data frame serialization and sending the output to the browser are not included.",
+        ""
+    ]
+    for output_name, profiler in profilers.items():
+        remap = []
+        for key in profiler.keys:
+            if key not in frame_index:
+                frame_index[key] = len(frames)
+                frames.append({"name": key[0], "file": key[1], "line": key[2]})
+            remap.append(frame_index[key])
+
+        profiles.append({
+            "type": "evented",
+            "name": output_name,
+            "unit": "nanoseconds",
+            "startValue": 0,
+            "endValue": profiler.end,
+            "events": [{"type": kind, "frame": remap[index], "at": at} for kind, index, at in profiler.events]
+        })
+
+        summary.append(f"{output_name}: {profiler.end / 1e6:.1f} ms")
+        summary.append(f"    {'self ms':>10} {'total ms':>10}  function")
+        for (name, file, line), self_ns, total_ns in profiler.top_functions():
+            summary.append(f"    {self_ns / 1e6:>10.2f} {total_ns / 1e6:>10.2f}  {name} ({file}:{line})")
+        summary.append("")
+
+    speedscope = {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": f"Olympic Dashboard flush {stem.name}",
+        "exporter": "olympic-dashboard",
+        "shared": {"frames": frames},
+        "profiles": profiles
+    }
+    stem.with_suffix(".speedscope.json").write_text(json.dumps(speedscope))
+    stem.with_suffix(".txt").write_text("\n".join(summary))
+    prune_flush_profiles()
+
+
+# Keeping only the most recent flush profiles, the file names start with their timestamp
+def prune_flush_profiles():
+    stems = sorted(path.name[:-len(".speedscope.json")] for path in profile_dir.glob("*.speedscope.json"))
+    for stem in stems[:max(len(stems) - profile_keep, 0)]:
+        (profile_dir / f"{stem}.speedscope.json").unlink(missing_ok=True)
+        (profile_dir / f"{stem}.txt").unlink(missing_ok=True)
+
+
 # Creating a dataframe where "No Medal" values are removed
 medal_df = df[df['Medal'] != 'No Medal']
 
 # Getting the youngest player of the olympics
-youngest_player = df[df['Age'] == df['Age'].min()][['Name', 'Sex', 'Age', 'Sport', 'Team']].iloc[0]
+youngest_player = cached_aggregate(
+    "youngest_player",
+    lambda: row_to_dict(df[df['Age'] == df['Age'].min()][['Name', 'Sex', 'Age', 'Sport', 'Team']].iloc[0])
+)
 youngest_box = ui.value_box(
     title="Youngest Player of Olympics",
     value=f"{youngest_player['Name']} ({int(youngest_player['Age'])} yrs) - {youngest_player['Sport']} ({youngest_player['Team']})",
@@ -37,7 +277,10 @@ youngest_box = ui.value_box(
 
 
 # Getting the oldest player of the olympics
-oldest_player = df[df['Age'] == df['Age'].max()][['Name', 'Sex', 'Age', 'Sport', 'Team']].iloc[0]
+oldest_player = cached_aggregate(
+    "oldest_player",
+    lambda: row_to_dict(df[df['Age'] == df['Age'].max()][['Name', 'Sex', 'Age', 'Sport', 'Team']].iloc[0])
+)
 oldest_box = ui.value_box(
     title="Oldest Player of Olympics",
     value=f"{oldest_player['Name']} ({int(oldest_player['Age'])} yrs) - {oldest_player['Sport']} ({oldest_player['Team']})",
@@ -45,13 +288,16 @@ oldest_box = ui.value_box(
 )
 
 # Getting the player with most medals
-most_medals_player = (
-    medal_df[medal_df['Medal'].notna()]
-    .groupby(['Name', 'Team'])
-    .size()
-    .sort_values(ascending=False)
-    .reset_index(name='MedalCount')
-    .iloc[0]
+most_medals_player = cached_aggregate(
+    "most_medals_player",
+    lambda: row_to_dict(
+        medal_df[medal_df['Medal'].notna()]
+        .groupby(['Name', 'Team'])
+        .size()
+        .sort_values(ascending=False)
+        .reset_index(name='MedalCount')
+        .iloc[0]
+    )
 )
 
 most_medals_player_box = ui.value_box(
@@ -62,13 +308,16 @@ most_medals_player_box = ui.value_box(
 
 
 # Getting the country with most medals
-most_medals_country = (
-    medal_df[medal_df['Medal'].notna()]
-    .groupby('NOC')
-    .size()
-    .sort_values(ascending=False)
-    .reset_index(name='MedalCount')
-    .iloc[0]
+most_medals_country = cached_aggregate(
+    "most_medals_country",
+    lambda: row_to_dict(
+        medal_df[medal_df['Medal'].notna()]
+        .groupby('NOC')
+        .size()
+        .sort_values(ascending=False)
+        .reset_index(name='MedalCount')
+        .iloc[0]
+    )
 )
 most_medals_country_box = ui.value_box(
     title="Country with Most Medals",
@@ -78,7 +327,7 @@ most_medals_country_box = ui.value_box(
 
 
 # Total number of unique events
-total_events = df['Event'].nunique() 
+total_events = cached_aggregate("total_events", lambda: int(df['Event'].nunique()))
 total_events_box = ui.value_box(
     title="Total Number of Events",
     value=f"{total_events} events",
@@ -90,6 +339,338 @@ total_events_box = ui.value_box(
 
 
 
+# Years of the dataset, the only years whose Medal Table is cached
+medal_table_years = {int(year) for year in df['Year'].unique()}
+
+
+# Building the Medal Table html for a year, cached on disk per year
+def build_year_wise_table(year):
+    year_df = df[df['Year'] == year]
+    all_medal = year_df[year_df['Medal'] != 'No Medal'].drop_duplicates(subset=['Team', 'Year', 'Sport', 'Event', 'Medal'])
+
+
+    # Grouping by Year and Team to get the medal count
+    year_all_medals = all_medal.groupby(['Year', 'Team'])['Medal'].count().reset_index().sort_values(by=['Year', 'Medal'], ascending=[True,False]).rename(columns={'Medal':'Total'})
+
+    # Gold medal count grouped by Year and Team
+    gold_medal = year_df[year_df['Medal'] == 'Gold'].drop_duplicates(subset=['Team', 'Year', 'Sport', 'Event', 'Medal'])
+
+    year_team_gold = gold_medal.groupby(['Year', 'Team'])['Medal'].count().reset_index().sort_values(by=['Year', 'Medal'], ascending=[True,False]).rename(columns={'Medal':'Gold'})
+
+    # Silver medal count grouped by Year and Team
+    silver_medal = year_df[year_df['Medal'] == 'Silver'].drop_duplicates(subset=['Team', 'Year', 'Sport', 'Event', 'Medal'])
+
+    year_team_silver = silver_medal.groupby(['Year', 'Team'])['Medal'].count().reset_index().sort_values(by=['Year', 'Medal'], ascending=[True,False]).rename(columns={'Medal':'Silver'})
+
+    # Bronze medal count grouped by Year and Team
+    bronze_medal = year_df[year_df['Medal'] == 'Bronze'].drop_duplicates(subset=['Team', 'Year', 'Sport', 'Event', 'Medal'])
+    year_team_bronze = bronze_medal.groupby(['Year', 'Team'])['Medal'].count().reset_index().sort_values(by=['Year', 'Medal'], ascending=[True,False]).rename(columns={'Medal':'Bronze'})
+
+    # Merging gold and silver tables
+    gold_silver = pd.merge(year_team_gold, year_team_silver, on=['Year', 'Team'])
+
+
+    # Merging gold_silver and bronze tables
+    gold_silver_bronze = pd.merge(gold_silver, year_team_bronze, on=['Year', 'Team'])
+
+
+    # Merging gold_silver_bronze and all medal tables
+    all_medal_df = pd.merge(gold_silver_bronze, year_all_medals, on=['Year', 'Team'])
+    all_medal_df.drop('Year', inplace=True, axis=1)
+    all_medal_df = all_medal_df.sort_values(by='Total', ascending=False)
+
+
+    # Making the team names bold
+    all_medal_df['Team'] = all_medal_df['Team'].apply(lambda x: f"<strong>{x}</strong>")
+
+
+    if all_medal_df.empty:
+        return None
+
+    def circle_span(val, bg_color):
+        return f'<span style="display:inline-block;width:32px;height:32px;line-height:32px;background-color:{bg_color};color:black;font-weight:bold;border-radius:50%;text-align:center;">{int(val)}</span>'
+
+    all_medal_df['Gold'] = all_medal_df['Gold'].apply(lambda x: circle_span(x, '#FFD700'))
+    all_medal_df['Silver'] = all_medal_df['Silver'].apply(lambda x: circle_span(x, '#C0C0C0'))
+    all_medal_df['Bronze'] = all_medal_df['Bronze'].apply(lambda x: circle_span(x, '#CD7F32'))
+
+    return (
+        all_medal_df.to_html(
+            index=False,
+            escape=False,
+            classes="styled-table",
+            justify="center"
+        ) + """
+        <style>
+        .styled-table {
+            width: 100%;
+            border-collapse: collapse;
+            font-size: 16px;
+            text-align: center;
+        }
+        .styled-table th, .styled-table td {
+            padding: 12px 15px;
+            border: 1px solid #ddd;
+        }
+        .styled-table th {
+            background-color: #f2f2f2;
+        }
+        </style>
+        """
+    )
+
+
+# IOC country codes that differ from the ISO-3 codes used by the map, including
+# historical NOCs, which are drawn on the territory of their successor country
+noc_to_iso3 = {
+    'ALG': 'DZA', 'ANG': 'AGO', 'ANT': 'ATG', 'ARU': 'ABW', 'ASA': 'ASM', 'BAH': 'BHS',
+    'BAN': 'BGD', 'BAR': 'BRB', 'BER': 'BMU', 'BHU': 'BTN', 'BIZ': 'BLZ', 'BOT': 'BWA',
+    'BRN': 'BHR', 'BRU': 'BRN', 'BUL': 'BGR', 'BUR': 'BFA', 'CAM': 'KHM', 'CAY': 'CYM', 'CGO': 'COG',
+    'CHA': 'TCD', 'CHI': 'CHL', 'CRC': 'CRI', 'CRO': 'HRV', 'DEN': 'DNK', 'ESA': 'SLV',
+    'FIJ': 'FJI', 'GAM': 'GMB', 'GBS': 'GNB', 'GEQ': 'GNQ', 'GER': 'DEU', 'GRE': 'GRC',
+    'GRN': 'GRD', 'GUA': 'GTM', 'GUI': 'GIN', 'HAI': 'HTI', 'HON': 'HND', 'INA': 'IDN',
+    'IRI': 'IRN', 'ISV': 'VIR', 'IVB': 'VGB', 'KSA': 'SAU', 'KUW': 'KWT', 'LAT': 'LVA',
+    'LBA': 'LBY', 'LES': 'LSO', 'LIB': 'LBN', 'MAD': 'MDG', 'MAS': 'MYS', 'MAW': 'MWI',
+    'MGL': 'MNG', 'MON': 'MCO', 'MRI': 'MUS', 'MTN': 'MRT', 'MYA': 'MMR', 'NCA': 'NIC',
+    'NED': 'NLD', 'NEP': 'NPL', 'NGR': 'NGA', 'NIG': 'NER', 'OMA': 'OMN', 'PAR': 'PRY',
+    'PHI': 'PHL', 'PLE': 'PSE', 'POR': 'PRT', 'PUR': 'PRI', 'RSA': 'ZAF', 'SAM': 'WSM',
+    'SEY': 'SYC', 'SIN': 'SGP', 'SKN': 'KNA', 'SLO': 'SVN', 'SOL': 'SLB', 'SRI': 'LKA',
+    'SUD': 'SDN', 'SUI': 'CHE', 'TAN': 'TZA', 'TGA': 'TON', 'TOG': 'TGO', 'TPE': 'TWN',
+    'TRI': 'TTO', 'UAE': 'ARE', 'URU': 'URY', 'VAN': 'VUT', 'VIE': 'VNM', 'VIN': 'VCT',
+    'ZAM': 'ZMB', 'ZIM': 'ZWE',
+    # Historical NOCs
+    'AHO': 'CUW', 'ANZ': 'AUS', 'BOH': 'CZE', 'CEY': 'LKA', 'CRT': 'GRC', 'EUA': 'DEU', 'EUN': 'RUS', 'FRG': 'DEU',
+    'GDR': 'DEU', 'MAL': 'MYS', 'NBO': 'MYS', 'RHO': 'ZWE', 'SAA': 'DEU', 'SCG': 'SRB',
+    'TCH': 'CZE', 'UAR': 'EGY', 'URS': 'RUS', 'WIF': 'JAM', 'YAR': 'YEM',
+    'YMD': 'YEM', 'YUG': 'SRB'
+}
+
+
+# Medals per country for every Games of a season, using the Medal Table deduplication per NOC,
+# since the cleaned Team column merges several NOCs into one label.
+# Only the per-year values are stored; the countries are shared by every frame.
+def build_medal_map_frames(season):
+    season_medals = medal_df[medal_df['Season'] == season].drop_duplicates(subset=['NOC', 'Year', 'Sport', 'Event', 'Medal'])
+    season_medals = season_medals.assign(ISO3=season_medals['NOC'].map(noc_to_iso3).fillna(season_medals['NOC']))
+    counts = season_medals.groupby(['Year', 'ISO3']).size().unstack(fill_value=0).sort_index()
+
+    # Labelling each country with the NOCs drawn on it, as the cleaned Team names do not identify them
+    iso3_nocs = season_medals.groupby('ISO3')['NOC'].agg(lambda nocs: ", ".join(sorted(nocs.unique())))
+
+    return {
+        "years": [int(year) for year in counts.index],
+        "locations": counts.columns.tolist(),
+        "nocs": iso3_nocs.reindex(counts.columns).fillna('').tolist(),
+        "values": counts.values.tolist()
+    }
+
+
+# Animated medal map figures, built once per season and reused by every session
+map_seasons = ["Summer", "Winter"]
+medal_map_figures = {}
+
+
+def medal_map_figure(season):
+    if season in medal_map_figures:
+        return medal_map_figures[season]
+
+    frames = cached_aggregate(f"medal_map_frames:{season}", lambda: build_medal_map_frames(season))
+    if not frames["years"]:
+        medal_map_figures[season] = None
+        return None
+
+    # Every frame only carries its z values, the locations come from the base trace
+    fig = go.Figure(
+        data=[go.Choropleth(
+            locations=frames["locations"],
+            locationmode="ISO-3",
+            z=frames["values"][0],
+            text=frames["nocs"],
+            zmin=0,
+            zmax=max(max(values) for values in frames["values"]),
+            colorscale="YlOrRd",
+            colorbar={"title": "Medals"},
+            hovertemplate="%{location} (NOC: %{text})<br>Medals: %{z}<extra></extra>"
+        )],
+        frames=[
+            go.Frame(data=[go.Choropleth(z=values)], traces=[0], name=str(year))
+            for year, values in zip(frames["years"], frames["values"])
+        ]
+    )
+
+    frame_args = {"frame": {"duration": 0, "redraw": True}, "mode": "immediate", "transition": {"duration": 0}}
+    fig.update_layout(
+        title={"text": f"{season} Olympics Medals by Country", "x": 0.5},
+        geo=dict(showframe=False, showcoastlines=False),
+        height=700,
+        updatemenus=[{
+            "type": "buttons",
+            "showactive": False,
+            "x": 0.05,
+            "y": 0,
+            "xanchor": "right",
+            "yanchor": "top",
+            "buttons": [
+                {
+                    "label": "Play",
+                    "method": "animate",
+                    "args": [None, {"frame": {"duration": 700, "redraw": True}, "fromcurrent": True, "transition": {"duration": 0}}]
+                },
+                {
+                    "label": "Pause",
+                    "method": "animate",
+                    "args": [[None], frame_args]
+                }
+            ]
+        }],
+        sliders=[{
+            "active": 0,
+            "currentvalue": {"prefix": "Year: "},
+            "pad": {"t": 30},
+            "steps": [
+                {"label": str(year), "method": "animate", "args": [[str(year)], frame_args]}
+                for year in frames["years"]
+            ]
+        }]
+    )
+
+    medal_map_figures[season] = fig
+    return fig
+
+
+# Teams of the dataset, the only teams whose rollups are cached
+team_names = set(df['Team'].unique())
+
+
+# Per-team medal rollups behind the Team Performance charts, cached on disk per team
+def build_team_rollups(team):
+    team_medals = medal_df[medal_df['Team'] == team]
+    season_medal_count = team_medals.groupby(['Season', 'Year'])['Medal'].count().reset_index()
+    sport_medal = team_medals.groupby('Sport')['Medal'].count().sort_values(ascending=False)[:10]
+
+    return {
+        "season_year": json.loads(season_medal_count.to_json(orient="records")),
+        "sports": json.loads(sport_medal.to_json())
+    }
+
+
+def team_rollups(team):
+    if team not in team_names:
+        return build_team_rollups(team)
+    return cached_aggregate(f"team_rollups:{team}", lambda: build_team_rollups(team))
+
+
+# Medals per year of a team in one season, used by the Medals Over the Years lineplot
+def team_season_medals(team, season):
+    season_medal_count = pd.DataFrame(team_rollups(team)["season_year"], columns=['Season', 'Year', 'Medal'])
+    return season_medal_count[season_medal_count['Season'] == season]
+
+
+# Medals over the years lineplot of a team in one season
+def lineplot_figure(team, season):
+    filtered_df = team_season_medals(team, season)
+    if filtered_df.empty:
+        return ui.markdown(f"**No medals have been won by {team} in the {season} Olympics.**")
+    fig = px.line(
+        x=filtered_df.Year,
+        y=filtered_df.Medal,
+        markers=True
+    ).update_layout(
+        title={"text": f"{season} Olympics Medals Over the Years for {team}", "x": 0.5},
+        yaxis_title="Count of Medals",
+        xaxis_title="Year"
+    )
+    return fig
+
+
+# Sports in which a team won medals in one year, used by the medalist table sport filter
+def team_year_sports(team, year):
+    medalists = medal_df[
+        (medal_df['Year'] == year) &
+        (medal_df['Team'] == team)
+    ]
+    return sorted(medalists['Sport'].dropna().unique().tolist())
+
+
+# All medalists of a team for one year and sport, as the html shown in the medalist table
+def medalist_table_html(team, year, sport):
+    filtered_df = medal_df[
+        (medal_df['Team'] == team) &
+        (medal_df['Year'] == year) &
+        (medal_df['Sport'] == sport)
+    ]
+
+    if filtered_df.empty:
+        return None
+
+    medalist_summary = (
+        filtered_df.groupby(['Name', 'Sex', 'Age', 'Height', 'Weight', 'Medal'])
+        .size()
+        .unstack(fill_value=0)
+        .reset_index()
+        .rename_axis(None, axis=1)
+    )
+
+    # Formatting medal column
+    def format_medals(row):
+        medal_html = ""
+        if 'Gold' in row and row['Gold'] > 0:
+            medal_html += f"<div class='medal gold'>{row['Gold']}</div> "
+        if 'Silver' in row and row['Silver'] > 0:
+            medal_html += f"<div class='medal silver'>{row['Silver']}</div> "
+        if 'Bronze' in row and row['Bronze'] > 0:
+            medal_html += f"<div class='medal bronze'>{row['Bronze']}</div>"
+        return medal_html.strip()
+
+    medalist_summary['Medals'] = medalist_summary.apply(format_medals, axis=1)
+    medalist_summary = medalist_summary.drop(columns=['Gold', 'Silver', 'Bronze'], errors='ignore')
+
+    # Keeping only necessary columns
+    display_df = medalist_summary[['Name', 'Sex', 'Age', 'Height', 'Weight', 'Medals']]
+
+    return (
+        display_df.to_html(
+            index=False,
+            escape=False,
+            classes="styled-table",
+            justify="center"
+        ) + """
+        <style>
+        .styled-table {
+            width: 100%;
+            border-collapse: collapse;
+            font-size: 16px;
+            text-align: center;
+        }
+        .styled-table th, .styled-table td {
+            padding: 12px 15px;
+            border: 1px solid #ddd;
+        }
+        .styled-table th {
+            background-color: #f2f2f2;
+        }
+        .medal {
+            display: inline-block;
+            width: 30px;
+            height: 30px;
+            line-height: 30px;
+            border-radius: 50%;
+            color: black;
+            text-align: center;
+            font-weight: bold;
+        }
+        .gold { background: gold; }
+        .silver { background: silver; color: black; }
+        .bronze { background: #cd7f32; }
+        </style>
+        """
+    )
+
+
+# Background workers shared by all sessions for prefetching likely next views
+prefetch_executor = ThreadPoolExecutor(max_workers=2)
+
+
 # Defining the UI
 app_ui = ui.page_navbar(
     ui.nav_panel("Team Performance Analysis",
@@ -252,6 +833,23 @@ ui.nav_panel("Additional Info",
                         ui.output_ui("average_age_map")
                     )
                 ]
+            ),
+
+            ui.layout_column_wrap(
+                width=12,
+                *[
+                    ui.card(
+                        ui.markdown('<h4 style="text-align: center;">Medals by Country Across the Games</h4>'),
+                        ui.input_radio_buttons(
+                            "map_season",
+                            "Select Season:",
+                            choices=map_seasons,
+                            selected="Summer",
+                            inline=True
+                        ),
+                        ui.output_ui("medal_map")
+                    )
+                ]
             )
         )
     ),
@@ -268,6 +866,118 @@ ui.nav_panel("Additional Info",
 # Defining the server
 def server(input, output, session):
 
+    # Profiles of the outputs rendered in the current flush, keyed by output name
+    pending_profiles = {}
+
+    def profiling_enabled():
+        if profile_always:
+            return True
+        if not profile_token:
+            return False
+        with reactive.isolate():
+            query = parse_qs(session.input[".clientdata_url_search"]().lstrip("?"))
+        return hmac.compare_digest(query.get("profile", [""])[0].encode(), profile_token.encode())
+
+    def profiled(fn):
+        @functools.wraps(fn)
+        def wrapper():
+            if not profiling_enabled():
+                return fn()
+            profiler = OutputProfiler()
+            pending_profiles[fn.__name__] = profiler
+            return profiler.run(lambda: serialized(fn()))
+        return wrapper
+
+    # Plotly figures are turned into html by the renderer after the output
+    # function returns; doing it here includes that step in the profile
+    def serialized(result):
+        if isinstance(result, go.Figure):
+            return ui.HTML(result._repr_html_())
+        return result
+
+    def write_pending_profiles():
+        if not pending_profiles:
+            return
+        # A profile that cannot be written must never break the session
+        try:
+            write_flush_profile(session.id, dict(pending_profiles))
+        except Exception:
+            logger.exception("Could not write the flush profile to %s", profile_dir)
+        finally:
+            pending_profiles.clear()
+
+    if profile_always or profile_token:
+        session.on_flushed(write_pending_profiles, once=False)
+
+    # Likely next views of the selected country, computed in the background after
+    # the country changes so that the follow-up drilldown renders instantly
+    prefetched = {}
+    prefetch_job = {"cancelled": threading.Event()}
+    prefetch_lock = threading.Lock()
+
+    def prefetched_or_compute(key, compute):
+        if key in prefetched:
+            return prefetched[key]
+        return compute()
+
+    def prefetch_next_views(team, season, cancelled):
+        # The job may have waited behind other sessions' work in the shared executor
+        if cancelled.is_set():
+            return
+
+        other_season = "Winter" if season == "Summer" else "Summer"
+
+        # Storing a result unless the user has moved on to another country. The
+        # lock keeps the check and the write together, so start_prefetch cannot
+        # cancel and clear in between and leave this country's result behind.
+        def store(key, value):
+            with prefetch_lock:
+                if cancelled.is_set():
+                    return False
+                prefetched[key] = value
+                return True
+
+        if not store(("lineplot", team, other_season), lineplot_figure(team, other_season)):
+            return
+
+        team_medal_years = medal_df.loc[medal_df['Team'] == team, 'Year']
+        if team_medal_years.empty:
+            return
+        year = int(team_medal_years.max())
+
+        sports = team_year_sports(team, year)
+        if not store(("sports", team, year), sports) or not sports:
+            return
+
+        store(("medalists", team, year, sports[0]), medalist_table_html(team, year, sports[0]))
+
+    # Errors of a background job would otherwise be lost in its Future
+    def log_prefetch_failure(job):
+        if not job.cancelled() and job.exception() is not None:
+            logger.error("Prefetching views failed", exc_info=job.exception())
+
+    @reactive.effect
+    @reactive.event(input.x)
+    def start_prefetch():
+        with prefetch_lock:
+            prefetch_job["cancelled"].set()
+            prefetched.clear()
+
+        cancelled = threading.Event()
+        prefetch_job["cancelled"] = cancelled
+        team = input.x()
+        season = input.season_choice()
+
+        # Starting once the current outputs have been sent, while the browser renders them
+        def submit():
+            if not cancelled.is_set():
+                job = prefetch_executor.submit(prefetch_next_views, team, season, cancelled)
+                job.add_done_callback(log_prefetch_failure)
+
+        session.on_flushed(submit, once=True)
+
+    session.on_ended(lambda: prefetch_job["cancelled"].set())
+
     # Getting the input of the user
     @reactive.calc
     def selected_team_df():
@@ -280,6 +990,7 @@ def server(input, output, session):
 
     @output
     @render.data_frame
+    @profiled
     def athlete_df():
         medal_df = selected_team_medals().drop_duplicates(subset=['Team', 'Year', 'Sport', 'Event', 'Medal'])
         athlete_performance = (
@@ -300,6 +1011,7 @@ def server(input, output, session):
 
     @output
     @render.ui
+    @profiled
     def barplot():
         medal_df = selected_team_medals()
         medal_count = medal_df['Medal'].value_counts()
@@ -335,30 +1047,18 @@ def server(input, output, session):
     # Medals over the years lineplot
     @output
     @render.ui
+    @profiled
     def lineplot():
-        medal_df = selected_team_medals()
+        team = input.x()
         season = input.season_choice()
-        season_medal_count = medal_df.groupby(['Season', 'Year'])['Medal'].count().reset_index()
-        filtered_df = season_medal_count[season_medal_count['Season'] == season]
-        if filtered_df.empty:
-            return ui.markdown(f"**No medals have been won by {input.x()} in the {season} Olympics.**")
-        fig = px.line(
-            x=filtered_df.Year,
-            y=filtered_df.Medal,
-            markers=True
-        ).update_layout(
-            title={"text": f"{season} Olympics Medals Over the Years for {input.x()}", "x": 0.5},
-            yaxis_title="Count of Medals",
-            xaxis_title="Year"
-        )
-        return fig
+        return prefetched_or_compute(("lineplot", team, season), lambda: lineplot_figure(team, season))
 
 
     @output
     @render.ui
+    @profiled
     def barplot_2():
-        medal_df = selected_team_medals()
-        sport_medal = medal_df.groupby('Sport')['Medal'].count().sort_values(ascending=False)[:10]
+        sport_medal = pd.Series(team_rollups(input.x())["sports"], dtype="int64")
 
         if sport_medal.empty:
             return ui.markdown(f"**No medals have been won by {input.x()}.**")
@@ -384,6 +1084,7 @@ def server(input, output, session):
     # Dropdown selection filtering for all medalist table
     @output
     @render.ui
+    @profiled
     def sport_filter_ui():
         selected_year = input.year_filter()
         selected_team = input.x() 
@@ -397,17 +1098,14 @@ def server(input, output, session):
             return ui.HTML("<p style='text-align:center;'>Invalid year selected.</p>")
         
         
-        medalists = df[
-            (df['Year'] == year) &
-            (df['Team'] == selected_team) &
-            (df['Medal'] != 'No Medal')
-        ]
+        available_sports = prefetched_or_compute(
+            ("sports", selected_team, year),
+            lambda: team_year_sports(selected_team, year)
+        )
         
-        if medalists.empty:
+        if not available_sports:
             return ui.HTML("<p style='text-align:center;'>No sports found with medalists for this country and year.</p>")
         
-        available_sports = sorted(medalists['Sport'].dropna().unique().tolist())
-        
         return ui.input_selectize(
             "sport_filter",
             "Select Sport:",
@@ -421,11 +1119,12 @@ def server(input, output, session):
     # All medalists Table with Year and Sport as filters
     @output
     @render.ui
+    @profiled
     def medalist_df():
-        team_df = df[df['Team'] == input.x()]
-        medal_df = team_df[team_df['Medal'] != 'No Medal']
+        team = input.x()
+        sport = input.sport_filter()
 
-        if input.year_filter() is None or input.sport_filter() is None:
+        if input.year_filter() is None or sport is None:
             return ui.HTML("<p style='text-align:center;'>Please select both Year and Sport to view results.</p>")
 
         try:
@@ -433,80 +1132,20 @@ def server(input, output, session):
         except (ValueError, TypeError):
             return ui.HTML("<p style='text-align:center;'>Invalid year selected.</p>")
 
-        filtered_df = medal_df[
-            (medal_df['Year'] == year) &
-            (medal_df['Sport'] == input.sport_filter())
-        ]
+        table_html = prefetched_or_compute(
+            ("medalists", team, year, sport),
+            lambda: medalist_table_html(team, year, sport)
+        )
 
-        if filtered_df.empty:
+        if table_html is None:
             return ui.HTML("<p style='text-align:center;'>We couldn't find any results matching the selected criteria.</p>")
 
-        medalist_summary = (
-            filtered_df.groupby(['Name', 'Sex', 'Age', 'Height', 'Weight', 'Medal'])
-            .size()
-            .unstack(fill_value=0)
-            .reset_index()
-            .rename_axis(None, axis=1)
-        )
-
-        # Formatting medal column
-        def format_medals(row):
-            medal_html = ""
-            if 'Gold' in row and row['Gold'] > 0:
-                medal_html += f"<div class='medal gold'>{row['Gold']}</div> "
-            if 'Silver' in row and row['Silver'] > 0:
-                medal_html += f"<div class='medal silver'>{row['Silver']}</div> "
-            if 'Bronze' in row and row['Bronze'] > 0:
-                medal_html += f"<div class='medal bronze'>{row['Bronze']}</div>"
-            return medal_html.strip()
-
-        medalist_summary['Medals'] = medalist_summary.apply(format_medals, axis=1)
-        medalist_summary = medalist_summary.drop(columns=['Gold', 'Silver', 'Bronze'], errors='ignore')
-
-        # Keeping only necessary columns
-        display_df = medalist_summary[['Name', 'Sex', 'Age', 'Height', 'Weight', 'Medals']]
-
-        return ui.HTML(
-            display_df.to_html(
-                index=False,
-                escape=False,
-                classes="styled-table",
-                justify="center"
-            ) + """
-            <style>
-            .styled-table {
-                width: 100%;
-                border-collapse: collapse;
-                font-size: 16px;
-                text-align: center;
-            }
-            .styled-table th, .styled-table td {
-                padding: 12px 15px;
-                border: 1px solid #ddd;
-            }
-            .styled-table th {
-                background-color: #f2f2f2;
-            }
-            .medal {
-                display: inline-block;
-                width: 30px;
-                height: 30px;
-                line-height: 30px;
-                border-radius: 50%;
-                color: black;
-                text-align: center;
-                font-weight: bold;
-            }
-            .gold { background: gold; }
-            .silver { background: silver; color: black; }
-            .bronze { background: #cd7f32; }
-            </style>
-            """
-        )
+        return ui.HTML(table_html)
 
     # Rendering the title for All medalists table
     @output
     @render.ui
+    @profiled
     def medalist_title():
         team = input.x()
         year = input.year_filter()
@@ -521,85 +1160,26 @@ def server(input, output, session):
     # Medal Table
     @output
     @render.ui
+    @profiled
     def year_wise_df():
-        year_df = df[df['Year'] == int(input.y())]
-        all_medal = year_df[year_df['Medal'] != 'No Medal'].drop_duplicates(subset=['Team', 'Year', 'Sport', 'Event', 'Medal'])
-
-
-        # Grouping by Year and Team to get the medal count
-        year_all_medals = all_medal.groupby(['Year', 'Team'])['Medal'].count().reset_index().sort_values(by=['Year', 'Medal'], ascending=[True,False]).rename(columns={'Medal':'Total'})
-
-        # Gold medal count grouped by Year and Team
-        gold_medal = year_df[year_df['Medal'] == 'Gold'].drop_duplicates(subset=['Team', 'Year', 'Sport', 'Event', 'Medal'])
-
-        year_team_gold = gold_medal.groupby(['Year', 'Team'])['Medal'].count().reset_index().sort_values(by=['Year', 'Medal'], ascending=[True,False]).rename(columns={'Medal':'Gold'})
-
-        # Silver medal count grouped by Year and Team
-        silver_medal = year_df[year_df['Medal'] == 'Silver'].drop_duplicates(subset=['Team', 'Year', 'Sport', 'Event', 'Medal'])
-
-        year_team_silver = silver_medal.groupby(['Year', 'Team'])['Medal'].count().reset_index().sort_values(by=['Year', 'Medal'], ascending=[True,False]).rename(columns={'Medal':'Silver'})
-
-        # Bronze medal count grouped by Year and Team
-        bronze_medal = year_df[year_df['Medal'] == 'Bronze'].drop_duplicates(subset=['Team', 'Year', 'Sport', 'Event', 'Medal'])
-        year_team_bronze = bronze_medal.groupby(['Year', 'Team'])['Medal'].count().reset_index().sort_values(by=['Year', 'Medal'], ascending=[True,False]).rename(columns={'Medal':'Bronze'})
-        
-        # Merging gold and silver tables
-        gold_silver = pd.merge(year_team_gold, year_team_silver, on=['Year', 'Team'])
-
-
-        # Merging gold_silver and bronze tables
-        gold_silver_bronze = pd.merge(gold_silver, year_team_bronze, on=['Year', 'Team'])
-
+        year = int(input.y())
 
-        # Merging gold_silver_bronze and all medal tables
-        all_medal_df = pd.merge(gold_silver_bronze, year_all_medals, on=['Year', 'Team'])
-        all_medal_df.drop('Year', inplace=True, axis=1)
-        all_medal_df = all_medal_df.sort_values(by='Total', ascending=False)
-
-
-        # Making the team names bold
-        all_medal_df['Team'] = all_medal_df['Team'].apply(lambda x: f"<strong>{x}</strong>")
+        # The year comes from the client, so unknown years never reach the cache
+        if year not in medal_table_years:
+            return pd.DataFrame({"Message": ["No data available for the selected year."]})
 
+        table_html = cached_aggregate(f"year_wise_df:{year}", lambda: build_year_wise_table(year))
 
-        if all_medal_df.empty:
+        if table_html is None:
             return pd.DataFrame({"Message": ["No data available for the selected year."]})
 
-        def circle_span(val, bg_color):
-            return f'<span style="display:inline-block;width:32px;height:32px;line-height:32px;background-color:{bg_color};color:black;font-weight:bold;border-radius:50%;text-align:center;">{int(val)}</span>'
-
-        all_medal_df['Gold'] = all_medal_df['Gold'].apply(lambda x: circle_span(x, '#FFD700'))
-        all_medal_df['Silver'] = all_medal_df['Silver'].apply(lambda x: circle_span(x, '#C0C0C0'))
-        all_medal_df['Bronze'] = all_medal_df['Bronze'].apply(lambda x: circle_span(x, '#CD7F32'))
-
-        return ui.HTML(
-            all_medal_df.to_html(
-                index=False,
-                escape=False,
-                classes="styled-table",
-                justify="center"
-            ) + """
-            <style>
-            .styled-table {
-                width: 100%;
-                border-collapse: collapse;
-                font-size: 16px;
-                text-align: center;
-            }
-            .styled-table th, .styled-table td {
-                padding: 12px 15px;
-                border: 1px solid #ddd;
-            }
-            .styled-table th {
-                background-color: #f2f2f2;
-            }
-            </style>
-            """
-        )
+        return ui.HTML(table_html)
 
 
     # Information about the host on Medal Table page
     @output
     @render.ui
+    @profiled
     def host_info():
         year_selected = int(input.y())
         host_city = df[df['Year'] == year_selected]['City'].unique()
@@ -641,6 +1221,7 @@ def server(input, output, session):
     # Title for gender ratio piechart
     @output
     @render.ui
+    @profiled
     def gender_ratio_description():
         sport = input.sport_type()
         if sport:
@@ -651,6 +1232,7 @@ def server(input, output, session):
     # Gender ratio piechart
     @output
     @render.ui
+    @profiled
     def gender_piechart():
         sports_df = df[df["Sport"] == input.sport_type()]
         gender_ratio = round(sports_df['Sex'].value_counts(normalize=True) * 100, 2)
@@ -675,6 +1257,7 @@ def server(input, output, session):
     # Gender ratio lineplot
     @output     
     @render.ui
+    @profiled
     def gender_lineplot():
         year_df = round(df.groupby('Year')['Sex'].value_counts(normalize=True)*100,2).reset_index()
         fig = px.line(year_df, x='Year', y='proportion', color='Sex')
@@ -685,6 +1268,7 @@ def server(input, output, session):
     # Median age of countries' participant's map
     @output
     @render.ui
+    @profiled
     def average_age_map():
 
         noc_to_team = df[["NOC", "Team"]].drop_duplicates()
@@ -728,6 +1312,25 @@ def server(input, output, session):
         return fig
 
 
+    # Animated medals per country map, scrubbing the timeline happens in the browser
+    @output
+    @render.ui
+    @profiled
+    def medal_map():
+        season = input.map_season()
+
+        # The season comes from the client, so only known seasons reach the figure and disk caches
+        if season not in map_seasons:
+            return ui.markdown("**Please select a season.**")
+
+        fig = medal_map_figure(season)
+
+        if fig is None:
+            return ui.markdown(f"**No medals found for the {season} Olympics.**")
+
+        return fig
+
+
     
     
 # Run the app